@@ -1,58 +1,195 @@
 import os
 import csv
-from typing import List, Dict, Optional
+import logging
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from operator import truediv
+from typing import Callable, List, Dict, Optional, Tuple
+
+# Столбцы одного файла прайса: названия, цены, веса и цены за кг.
+FileColumns = Tuple[List[str], array, array, array]
+
+logger = logging.getLogger(__name__)
 
 
 class PriceMachine:
     PRODUCT_KEYS = ["название", "продукт", "товар", "наименование"]
     PRICE_KEYS = ["цена", "розница"]
     WEIGHT_KEYS = ["фасовка", "масса", "вес"]
+    # Буфер чтения 1 МБ вместо стандартных 8 КБ: меньше системных вызовов read() на больших прайсах.
+    READ_BUFFER_SIZE = 1 << 20
+    WRITE_BUFFER_SIZE = 1 << 20
+    SEARCH_CACHE_SIZE = 64
+    # На Windows ProcessPoolExecutor не принимает max_workers больше 61.
+    MAX_WORKERS = 61
+    # Меньше этого суммарного объёма файлы разбираются в текущем процессе: запуск пула
+    # и передача столбцов между процессами обходятся дороже самого разбора.
+    PARALLEL_MIN_BYTES = 4 << 20
+    # Шаблон строки HTML-таблицы: номер, название, цена, фасовка, файл, цена за кг.
+    HTML_ROW = '''
+                <tr>
+                    <td>{}</td>
+                    <td>{}</td>
+                    <td>{}</td>
+                    <td>{}</td>
+                    <td>{}</td>
+                    <td>{:.2f}</td>
+                </tr>
+            '''
+    NAME_SEPARATOR = '\n'
 
     def __init__(self):
-        self.data = []
+        # Данные хранятся по столбцам: строка с индексом i — это names[i], prices[i], weights[i] и т.д.
+        self.names: List[str] = []
+        self.prices = array('d')
+        self.weights = array('d')
+        self.file_ids = array('I')
+        self.price_per_kg = array('d')
+        # Имя каждого файла хранится один раз, в строках — только его номер в этом списке.
+        self.filenames: List[str] = []
+        self._filename_ids: Dict[str, int] = {}
+        # Названия после casefold(), склеенные через NAME_SEPARATOR, и границы каждого названия в этом тексте.
+        # Это единственная копия названий для поиска без учёта регистра, строится один раз при загрузке.
+        self._names_text = ''
+        self._name_starts = array('q')
+        self._name_ends = array('q')
+        # Индексы найденных строк по запросу (LRU): уточняющий запрос фильтрует результат предыдущего.
+        self._search_cache: OrderedDict = OrderedDict()
         self.search_results = []
 
-    def load_prices(self, file_path: str) -> List[Dict]:
+    def load_prices(self, file_path: str) -> int:
         """
         Сканирует указанный каталог. Ищет файлы со словом 'price' в названии.
         В файле ищет столбцы с названием товара, ценой и весом.
+        Возвращает общее число загруженных позиций.
         """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Папка не найдена: {file_path}")
 
-        for filename in os.listdir(file_path):
-            if 'price' in filename.lower():
-                file_path_full = os.path.join(file_path, filename)
-                try:
-                    with open(file_path_full, 'r', encoding='utf-8') as file:
-                        reader = csv.DictReader(file, delimiter=',')
-                        for row in reader:
-                            product_name = self._get_value(row, self.PRODUCT_KEYS)
-                            price = self._get_value(row, self.PRICE_KEYS)
-                            weight = self._get_value(row, self.WEIGHT_KEYS)
-                            if product_name and price and weight:
-                                self.data.append({
-                                    "наименование": product_name,
-                                    "цена": float(price),
-                                    "вес": float(weight),
-                                    "файл": filename,
-                                    "цена за кг": float(price) / float(weight)
-                                })
-                except Exception as e:
-                    print(f"Ошибка при чтении файла {filename}: {e}")
-        return self.data
+        self._search_cache.clear()
+
+        with os.scandir(file_path) as entries:
+            files = [(entry.name, entry.path, entry.stat().st_size) for entry in entries
+                     if 'price' in entry.name.lower() and entry.is_file()]
+        if not files:
+            return len(self.names)
+        total_size = sum(size for _, _, size in files)
+
+        max_workers = min(len(files), os.cpu_count() or 1, self.MAX_WORKERS)
+        if total_size < self.PARALLEL_MIN_BYTES or max_workers == 1:
+            # Небольшие данные (или нечего распараллеливать) разбираются в текущем процессе.
+            for filename, path, _ in files:
+                self._add_file(filename, partial(_load_one, path))
+        else:
+            # Файлы независимы друг от друга, поэтому разбираются параллельно в отдельных процессах.
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_load_one, path) for _, path, _ in files]
+                for (filename, _, _), future in zip(files, futures):
+                    self._add_file(filename, future.result)
+
+        self._sort_rows()
+        self._build_search_text()
+        return len(self.names)
+
+    def _add_file(self, filename: str, load: Callable[[], Optional[FileColumns]]):
+        """Добавляет к данным столбцы одного файла, полученные вызовом load()."""
+        try:
+            columns = load()
+        except Exception as e:
+            logger.error("Ошибка при чтении файла %s: %s", filename, e)
+            return
+        if columns is None:
+            logger.warning("Файл %s пропущен: в заголовке нет столбцов с названием, ценой и весом", filename)
+            return
+        names, prices, weights, price_per_kg = columns
+        self.names.extend(names)
+        self.prices.extend(prices)
+        self.weights.extend(weights)
+        self.file_ids.extend(array('I', [self._file_id(filename)]) * len(names))
+        self.price_per_kg.extend(price_per_kg)
+
+    def rows(self) -> List[Dict]:
+        """Собирает все загруженные позиции в список словарей (по словарю на строку)."""
+        return self._rows(range(len(self.names)))
+
+    def _file_id(self, filename: str) -> int:
+        """Возвращает номер файла в self.filenames, добавляя его при первой встрече."""
+        file_id = self._filename_ids.setdefault(filename, len(self.filenames))
+        if file_id == len(self.filenames):
+            self.filenames.append(filename)
+        return file_id
+
+    def _rows(self, indices) -> List[Dict]:
+        """Собирает словари позиций по индексам строк."""
+        return [{
+            "наименование": self.names[i],
+            "цена": self.prices[i],
+            "вес": self.weights[i],
+            "файл": self.filenames[self.file_ids[i]],
+            "цена за кг": self.price_per_kg[i]
+        } for i in indices]
+
+    def _sort_rows(self):
+        """
+        Один раз после загрузки упорядочивает все столбцы по названию и цене за кг.
+        Дальше выгрузка и поиск просто идут по строкам в этом порядке.
+        """
+        names, price_per_kg = self.names, self.price_per_kg
+        order = sorted(range(len(names)), key=lambda i: (names[i], price_per_kg[i]))
+        self.names = [names[i] for i in order]
+        self.prices = array('d', (self.prices[i] for i in order))
+        self.weights = array('d', (self.weights[i] for i in order))
+        self.file_ids = array('I', (self.file_ids[i] for i in order))
+        self.price_per_kg = array('d', (price_per_kg[i] for i in order))
+
+    def _build_search_text(self):
+        """Склеивает названия после casefold() в один текст для поиска подстроки за один проход."""
+        starts, ends = array('q'), array('q')
+        folded_names = []
+        position = 0
+        for name in self.names:
+            folded = name.casefold()
+            folded_names.append(folded)
+            starts.append(position)
+            position += len(folded)
+            ends.append(position)
+            position += len(self.NAME_SEPARATOR)
+        self._names_text = self.NAME_SEPARATOR.join(folded_names)
+        self._name_starts, self._name_ends = starts, ends
+
+    @classmethod
+    def _find_columns(cls, header: List[str]) -> Optional[Tuple[int, int, int]]:
+        """
+        Один раз на файл определяет по заголовку номера столбцов с названием, ценой и весом.
+        Возвращает None, если какого-то из столбцов нет.
+        """
+        # Заголовки сравниваются без учёта регистра и пробелов по краям ("Цена ", "ЦЕНА").
+        field_map: Dict[str, int] = {}
+        for index, name in enumerate(header):
+            field_map.setdefault(name.strip().lower(), index)
+        columns = tuple(
+            next((field_map[key] for key in keys if key in field_map), None)
+            for keys in (cls.PRODUCT_KEYS, cls.PRICE_KEYS, cls.WEIGHT_KEYS)
+        )
+        if None in columns:
+            return None
+        return columns
 
     @staticmethod
-    def _get_value(item: Dict[str, str], keys: List[str]) -> Optional[str]:
-        """Возвращает значение из словаря по одному из ключей."""
-        for key in keys:
-            if key in item:
-                return item[key]
-        return None
+    def _to_float(value: str) -> Optional[float]:
+        """Преобразует значение в число, для некорректных значений возвращает None."""
+        try:
+            return float(value)
+        except ValueError:
+            return None
 
     def export_to_html(self, fname: str = 'output.html') -> str:
-        """Экспортирует данные в HTML файл."""
-        result = '''
+        """Экспортирует данные в HTML файл построчно. Возвращает имя файла."""
+        with open(fname, 'w', encoding='utf-8', buffering=self.WRITE_BUFFER_SIZE) as html_file:
+            html_file.write('''
         <!DOCTYPE html>
         <html>
         <head>
@@ -69,43 +206,76 @@ class PriceMachine:
                     <th>Файл</th>
                     <th>Цена за кг.</th>
                 </tr>
-        '''
-        for idx, item in enumerate(sorted(self.data, key=lambda x: (x["наименование"], x["цена за кг"])), start=1):
-            result += f'''
-                <tr>
-                    <td>{idx}</td>
-                    <td>{item['наименование']}</td>
-                    <td>{item['цена']}</td>
-                    <td>{item['вес']}</td>
-                    <td>{item['файл']}</td>
-                    <td>{item['цена за кг']:.2f}</td>
-                </tr>
-            '''
-        result += '''
+        ''')
+            write, row_format = html_file.write, self.HTML_ROW.format
+            files = map(self.filenames.__getitem__, self.file_ids)
+            rows = zip(self.names, self.prices, self.weights, files, self.price_per_kg)
+            for idx, row in enumerate(rows, start=1):
+                write(row_format(idx, *row))
+            html_file.write('''
             </table>
         </body>
         </html>
-        '''
-        with open(fname, 'w', encoding='utf-8') as html_file:
-            html_file.write(result)
-        return result
+        ''')
+        return fname
 
     def find_text(self, text: str) -> List[Dict]:
         """Ищет товары по указанному тексту в названии."""
-        results = []
-        for item in self.data:
-            if text.lower() in item['наименование'].lower():
-                results.append(item)
-        return sorted(results, key=lambda x: (x["наименование"], x["цена за кг"]))
+        return self._rows(self._match_indices(text.casefold()))
+
+    def _match_indices(self, needle: str) -> List[int]:
+        """
+        Возвращает индексы строк, в названии которых есть needle.
+        Проверяет только кандидатов из самого длинного закэшированного префикса запроса.
+        """
+        cache = self._search_cache
+        if needle in cache:
+            cache.move_to_end(needle)
+            return cache[needle]
+
+        prefix = max((key for key in cache if needle.startswith(key)), key=len, default=None)
+        if prefix is None and self.NAME_SEPARATOR not in needle:
+            indices = self._scan_names(needle)
+        else:
+            if prefix is None:
+                candidates = range(len(self._name_starts))
+            else:
+                cache.move_to_end(prefix)
+                candidates = cache[prefix]
+            # Поиск в границах названия внутри общего текста, без копирования названия.
+            text, starts, ends = self._names_text, self._name_starts, self._name_ends
+            indices = [i for i in candidates if text.find(needle, starts[i], ends[i]) != -1]
+        cache[needle] = indices
+        if len(cache) > self.SEARCH_CACHE_SIZE:
+            cache.popitem(last=False)
+        return indices
+
+    def _scan_names(self, needle: str) -> List[int]:
+        """
+        Ищет needle сразу во всех названиях через str.find по склеенному тексту,
+        без проверки каждой строки в цикле Python. После совпадения переходит к следующему названию.
+        """
+        text, starts = self._names_text, self._name_starts
+        if not starts:
+            return []
+        indices = []
+        pos = text.find(needle)
+        while pos != -1:
+            i = bisect_right(starts, pos) - 1
+            indices.append(i)
+            if i + 1 == len(starts):
+                break
+            pos = text.find(needle, starts[i + 1])
+        return indices
 
     def export_search_results_to_html(self, results: List[Dict], fname: str = 'output_search.html') -> str:
-        """Экспортирует результаты поиска в HTML файл."""
+        """Экспортирует результаты поиска в HTML файл. Возвращает имя файла или пустую строку, если результатов нет."""
         if not results:
             return ""
 
         sorted_results = sorted(results, key=lambda x: (x["наименование"], x["цена за кг"]))
 
-        with open(fname, 'w', encoding='utf-8') as html_file:
+        with open(fname, 'w', encoding='utf-8', buffering=self.WRITE_BUFFER_SIZE) as html_file:
             html_file.write('''
             <!DOCTYPE html>
             <html>
@@ -124,24 +294,17 @@ class PriceMachine:
                         <th>Цена за кг.</th>
                     </tr>
             ''')
+            write, row_format = html_file.write, self.HTML_ROW.format
             for idx, item in enumerate(sorted_results, start=1):
-                html_file.write(f'''
-                    <tr>
-                        <td>{idx}</td>
-                        <td>{item['наименование']}</td>
-                        <td>{item['цена']}</td>
-                        <td>{item['вес']}</td>
-                        <td>{item['файл']}</td>
-                        <td>{item['цена за кг']:.2f}</td>
-                    </tr>
-                ''')
+                write(row_format(idx, item['наименование'], item['цена'], item['вес'],
+                                 item['файл'], item['цена за кг']))
             html_file.write('''
                 </table>
             </body>
             </html>
             ''')
 
-        return ""
+        return fname
 
     def interactive_search(self):
         """Интерактивный поиск товаров."""
@@ -152,10 +315,12 @@ class PriceMachine:
                 break
             results = self.find_text(search_text)
             if results:
-                print(f"{'№':<5}{'Наименование':<40}{'цена':<10}{'вес':<10}{'файл':<15}{'цена за кг.':<10}")
-                for idx, item in enumerate(results, start=1):
-                    print(
-                        f"{idx:<5}{item['наименование']:<40}{item['цена']:<10.2f}{item['вес']:<10.2f}{item['файл']:<15}{item['цена за кг']:<10.2f}")
+                # Таблица собирается целиком и выводится одним print, а не по строке на позицию.
+                lines = [f"{'№':<5}{'Наименование':<40}{'цена':<10}{'вес':<10}{'файл':<15}{'цена за кг.':<10}"]
+                lines.extend(
+                    f"{idx:<5}{item['наименование']:<40}{item['цена']:<10.2f}{item['вес']:<10.2f}{item['файл']:<15}{item['цена за кг']:<10.2f}"
+                    for idx, item in enumerate(results, start=1))
+                print("\n".join(lines))
                 self.search_results.extend(results)
             else:
                 print("Ничего не найдено.")
@@ -163,7 +328,45 @@ class PriceMachine:
         self.export_search_results_to_html(self.search_results)
 
 
+def _load_one(file_path_full: str) -> Optional[FileColumns]:
+    """
+    Читает один файл прайса и возвращает его столбцы: названия, цены, веса и цены за кг.
+    Возвращает None, если в файле нет нужных столбцов.
+    Функция уровня модуля, чтобы её можно было выполнять в дочерних процессах.
+    """
+    names: List[str] = []
+    prices = array('d')
+    weights = array('d')
+    # utf-8-sig снимает BOM, который добавляет Excel при сохранении CSV, иначе первый заголовок не распознаётся.
+    with open(file_path_full, 'r', encoding='utf-8-sig',
+              buffering=PriceMachine.READ_BUFFER_SIZE, newline='') as file:
+        reader = csv.reader(file, delimiter=',')
+        # Файл отбрасывается по одному заголовку, до разбора остальных строк.
+        columns = PriceMachine._find_columns(next(reader, []))
+        if columns is None:
+            return None
+        name_col, price_col, weight_col = columns
+        min_length = max(columns) + 1
+        # Поиск атрибутов вынесен из цикла по строкам.
+        to_float = PriceMachine._to_float
+        add_name, add_price, add_weight = names.append, prices.append, weights.append
+        for row in reader:
+            if len(row) < min_length:
+                continue
+            product_name = row[name_col]
+            price = to_float(row[price_col])
+            weight = to_float(row[weight_col])
+            if product_name and price is not None and weight:
+                add_name(product_name)
+                add_price(price)
+                add_weight(weight)
+    # Цена за кг считается одним проходом по готовым столбцам, а не внутри разбора строк.
+    price_per_kg = array('d', map(truediv, prices, weights))
+    return names, prices, weights, price_per_kg
+
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
     folder_path = input("Введите путь к папке с файлами: ")
     pm = PriceMachine()
     try: